@@ -1,3 +1,5 @@
+#!/usr/bin/env python3
+"""
 check_pelosi_scrape.py
 
 What it does:
@@ -10,10 +12,13 @@ Usage:
 - Set environment vars TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID (required)
 - Optionally set USE_PLAYWRIGHT=1 to force Playwright rendering fallback
 - Run on schedule (GitHub Actions recommended for free scheduling)
+- Or set CHECK_INTERVAL=<seconds> to keep one process running and check in a loop
+  (reuses imports and HTTP keep-alive connections between checks)
 
 Dependencies:
-pip install requests beautifulsoup4 playwright
-# If using Playwright, you must also run:
+pip install requests selectolax orjson brotli
+# Optional, only needed for the rendering fallback (imported lazily):
+pip install playwright
 playwright install --with-deps chromium
 
 Notes:
@@ -25,9 +30,17 @@ from __future__ import annotations
 import os
 import re
 import sys
-import json
 import time
-@@ -40,16 +27,14 @@
+import logging
+from html import escape
+from typing import Any, Dict, List, Optional, Union
+
+import orjson
+import requests
+from selectolax.lexbor import LexborHTMLParser
+
+# --- Config ---
+POLITICIAN_PAGE = "https://www.quiverquant.com/congresstrading/politician/Nancy%20Pelosi-P000197"
 LAST_SEEN_FILE = "last_seen.json"
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT = os.getenv("TELEGRAM_CHAT_ID")
@@ -35,31 +48,57 @@ FORCE_PLAYWRIGHT = os.getenv("USE_PLAYWRIGHT", "") in ("1", "true", "True")
 
 USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0 Safari/537.36"
 
+# Shared HTTP session: keeps connections alive across the page fetch and Telegram calls.
+# Accept-Encoding is left to requests, which adds "br" by itself once brotli is installed.
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": USER_AGENT, "Accept": "text/html"})
+
 # logging
 logging.basicConfig(
     format="%(asctime)s %(levelname)s: %(message)s", level=logging.INFO
 )
 
 
+def _parse_check_interval(raw: str) -> int:
+    try:
+        return max(0, int(raw.strip() or 0))
+    except ValueError:
+        logging.warning("Ignoring invalid CHECK_INTERVAL=%r (expected whole seconds); running once.", raw)
+        return 0
+
+
+CHECK_INTERVAL = _parse_check_interval(os.getenv("CHECK_INTERVAL", ""))  # seconds; 0 = single run
+
+
 # --- Helpers: state ---
 def load_last_seen() -> Dict[str, Any]:
     if not os.path.exists(LAST_SEEN_FILE):
         return {}
-@@ -60,13 +45,10 @@ def load_last_seen() -> Dict[str, Any]:
+    try:
+        with open(LAST_SEEN_FILE, "rb") as f:
+            return orjson.loads(f.read())
+    except Exception as e:
         logging.warning("Failed to load last seen file: %s", e)
         return {}
 
 
 def save_last_seen(obj: Dict[str, Any]) -> None:
-    with open(LAST_SEEN_FILE, "w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2, ensure_ascii=False)
+    with open(LAST_SEEN_FILE, "wb") as f:
+        f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
 
 
 # --- Helpers: telegram ---
 def send_telegram(text: str) -> bool:
     if not TELEGRAM_TOKEN or not TELEGRAM_CHAT:
         logging.error("TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID must be set.")
-@@ -87,216 +69,80 @@ def send_telegram(text: str) -> bool:
+        return False
+    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
+    payload = {"chat_id": TELEGRAM_CHAT, "text": text, "parse_mode": "HTML", "disable_web_page_preview": True}
+    try:
+        r = SESSION.post(url, json=payload, timeout=15)
+        r.raise_for_status()
+        return True
+    except Exception as e:
         logging.exception("Failed to send Telegram message: %s", e)
         return False
 
@@ -67,13 +106,19 @@ def send_telegram(text: str) -> bool:
 # --- Parsing heuristics ---
 TICKER_RE = re.compile(r"^[A-Z0-9\.\-]{1,6}$")  # allow dot/dash (e.g., BRK.B)
 DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")  # YYYY-MM-DD style fallback
+QUARTER_RE = re.compile(r"\bQ[1-4]\b")  # e.g. "Q3 2024"
+SLASH_DATE_RE = re.compile(r"\d{1,2}/\d{1,2}/\d{2,4}")  # e.g. 6/20/2024
+TXN_RE = re.compile(r"buy|sell|purchase|sale|option", re.IGNORECASE)
+TABLE_TAG_RE = re.compile(r"<table\b", re.IGNORECASE)
+TABLE_TAG_BYTES_RE = re.compile(rb"<table\b", re.IGNORECASE)
+ROW_SELECTOR = "tr:has(> td)"  # data rows only; header-only <tr>s are skipped in C
 
 
 def row_to_trade(cols: List[str]) -> Optional[Dict[str, Any]]:
     """
     Given a list of cell texts for a table row, try to interpret it as a trade row.
     Expected typical columns (but may vary): [Ticker, Transaction, Filed, Traded, Description, ???]
-    Returns a dict with id and summary_text if heuristics match, else None.
+    Returns a dict with id and the matched fields if heuristics match, else None.
     """
     if not cols:
         return None
@@ -93,9 +138,9 @@ def row_to_trade(cols: List[str]) -> Optional[Dict[str, Any]]:
         return None
 
     # Find likely transaction (Buy/Sell/Option/...); common words
-    transaction = next((c for c in cols if any(w in c.lower() for w in ("buy", "sell", "purchase", "sale", "option"))), "")
+    transaction = next((c for c in cols if TXN_RE.search(c)), "")
     # Find traded/date-like column
-    traded = next((c for c in cols if DATE_RE.search(c) or re.search(r"\bQ[1-4]\b", c) or re.search(r"\d{1,2}/\d{1,2}/\d{2,4}", c)), "")
+    traded = next((c for c in cols if DATE_RE.search(c) or QUARTER_RE.search(c) or SLASH_DATE_RE.search(c)), "")
     # Fallback: if many columns, take 2nd or 3rd as transaction/traded
     if not transaction and len(cols) >= 2:
         transaction = cols[1]
@@ -103,16 +148,37 @@ def row_to_trade(cols: List[str]) -> Optional[Dict[str, Any]]:
         traded = cols[3]
 
     identifier = f"{ticker}||{transaction}||{traded}"
-    summary_text = f"{traded} — {transaction} {ticker} — {' | '.join(cols[4:]) if len(cols) > 4 else ''}".strip()
-    return {"id": identifier, "raw": cols, "summary_text": summary_text}
+    return {"id": identifier, "raw": cols, "ticker": ticker, "transaction": transaction, "traded": traded}
 
 
-def parse_trades_from_html(html: str) -> List[Dict[str, Any]]:
+def build_summary(trade: Dict[str, Any]) -> str:
+    """Human-readable one-liner for a trade; only built for trades we report."""
+    cols = trade["raw"]
+    extra = " | ".join(cols[4:]) if len(cols) > 4 else ""
+    return f"{trade['traded']} — {trade['transaction']} {trade['ticker']} — {extra}".strip()
+
+
+def _cell_text(node: Any) -> str:
+    """
+    Cell text built the way bs4's get_text(" ", strip=True) did (trade ids depend on it):
+    each text node stripped, empty ones dropped, the rest joined by a single space.
+    """
+    parts = (n.text_content.strip() for n in node.traverse(include_text=True) if n.is_text_node)
+    return " ".join(p for p in parts if p)
+
+
+def parse_trades_from_html(html: Union[str, bytes], limit: int = 5) -> List[Dict[str, Any]]:
     """
     Return a list of trade dicts (latest first heuristically).
-    Scans for table rows and applies heuristics.
+    Scans for table rows and applies heuristics, stopping after `limit` matches.
+    Accepts raw response bytes (UTF-8) as well as already-decoded HTML.
     """
-    soup = BeautifulSoup(html, "html.parser")
+    # Only table rows matter: skip building a DOM for pages without any table
+    # (e.g. the JS-rendered shell that sends us to the Playwright fallback).
+    table_re = TABLE_TAG_BYTES_RE if isinstance(html, bytes) else TABLE_TAG_RE
+    if not table_re.search(html):
+        return []
+    tree = LexborHTMLParser(html)
     trades = []
 
     # Strategy:
@@ -123,37 +189,44 @@ def parse_trades_from_html(html: str) -> List[Dict[str, Any]]:
     # 5) Return in appearance order (assume top-most is newest)
     # Attempt 1: headings
     possible_tables = []
-    for h in soup.find_all(["h2", "h3", "h4", "div"]):
-        if h.get_text(strip=True).lower().startswith("trades"):
+    # Headings only: text() on every <div> re-walks each subtree, O(n^2) in page size
+    for h in tree.css("h2, h3, h4"):
+        if h.text(strip=True).lower().startswith("trades"):
             # find table sibling or descendant
             parent = h.parent
             if parent:
-                possible_tables.extend(parent.find_all("table"))
-            # also try next siblings
-            sib = h.find_next_sibling()
+                possible_tables.extend(parent.css("table"))
+            # also try next siblings (skip over text nodes)
+            sib = h.next
+            while sib is not None and not sib.is_element_node:
+                sib = sib.next
             if sib:
-                possible_tables.extend(sib.find_all("table"))
+                possible_tables.extend(sib.css("table"))
     # Also gather any table at all
     if not possible_tables:
-        possible_tables = soup.find_all("table")
+        possible_tables = tree.css("table")
 
     # Parse table rows
     for table in possible_tables:
-        for tr in table.find_all("tr"):
-            cols = [td.get_text(" ", strip=True) for td in tr.find_all(["td", "th"])]
+        for tr in table.css(ROW_SELECTOR):
+            cols = [_cell_text(td) for td in tr.css("td, th")]
             trade = row_to_trade(cols)
             if trade:
                 trades.append(trade)
+                if len(trades) >= limit:
+                    break
         if trades:
             break  # prefer the first table that yields trades
 
     # Fallback: scan all <tr> on the page
     if not trades:
-        for tr in soup.find_all("tr"):
-            cols = [td.get_text(" ", strip=True) for td in tr.find_all(["td", "th"])]
+        for tr in tree.css(ROW_SELECTOR):
+            cols = [_cell_text(td) for td in tr.css("td, th")]
             trade = row_to_trade(cols)
             if trade:
                 trades.append(trade)
+                if len(trades) >= limit:
+                    break
     # De-dup while preserving order
     seen = set()
     unique = []
@@ -165,12 +238,37 @@ def parse_trades_from_html(html: str) -> List[Dict[str, Any]]:
 
 
 # --- Fetchers ---
-def fetch_via_requests(url: str) -> Optional[str]:
+class _NotModified:
+    """Type of NOT_MODIFIED, which fetch_via_requests returns for a 304 reply."""
+
+
+NOT_MODIFIED = _NotModified()  # distinct from an empty 200 body
+
+
+def fetch_via_requests(url: str, validators: Optional[Dict[str, Any]] = None) -> Union[bytes, _NotModified, None]:
+    """
+    Fetch the page with requests and return the raw body bytes; the parser decodes
+    them itself, so we skip requests' charset detection and the decoded str copy.
+    If `validators` holds an etag/last_modified from a previous run, send a
+    conditional GET and return NOT_MODIFIED when the server replies 304.
+    On 200 the fresh validators are written back into the dict.
+    """
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
     try:
-        headers = {"User-Agent": USER_AGENT, "Accept": "text/html"}
-        r = requests.get(url, headers=headers, timeout=20)
+        r = SESSION.get(url, headers=headers, timeout=20)
+        if r.status_code == 304:
+            return NOT_MODIFIED
         r.raise_for_status()
-        return r.text
+        logging.debug("Fetched %d bytes (Content-Encoding: %s)", len(r.content), r.headers.get("Content-Encoding"))
+        if validators is not None:
+            validators["etag"] = r.headers.get("ETag")
+            validators["last_modified"] = r.headers.get("Last-Modified")
+        return r.content
     except Exception as e:
         logging.warning("requests fetch failed: %s", e)
         return None
@@ -218,14 +316,23 @@ def main() -> int:
 
     html = None
     trades = []
+    # HTTP validators from the last run. Fresh ones are only saved with a new trade (so
+    # rotating ETags don't rewrite last_seen.json) and only if the plain HTML yielded
+    # trades, otherwise a 304 could hide changes that only Playwright rendering would see.
+    validators = {"etag": last.get("etag"), "last_modified": last.get("last_modified")}
+    keep_validators = False
 
     # 1) Try fast requests parse, unless forced to use playwright
     if not FORCE_PLAYWRIGHT:
         logging.info("Attempting requests-based fetch...")
-        html = fetch_via_requests(POLITICIAN_PAGE)
+        html = fetch_via_requests(POLITICIAN_PAGE, validators)
+        if html is NOT_MODIFIED:
+            logging.info("Page not modified since last check (304). No new trade.")
+            return 0
         if html:
-            trades = parse_trades_from_html(html)
+            trades = parse_trades_from_html(html, limit=1)
             if trades:
+                keep_validators = True
                 logging.info("Found %d trades via requests parsing.", len(trades))
             else:
                 logging.info("No trades found via requests parsing.")
@@ -239,7 +346,7 @@ def main() -> int:
         logging.info("Attempting Playwright rendering fetch as fallback...")
         html2 = fetch_via_playwright(POLITICIAN_PAGE)
         if html2:
-            trades = parse_trades_from_html(html2)
+            trades = parse_trades_from_html(html2, limit=1)
             if trades:
                 logging.info("Found %d trades via Playwright parsing.", len(trades))
             else:
@@ -257,11 +364,12 @@ def main() -> int:
         logging.info("No new trade (id matches last_seen).")
         return 0
 
-    # Compose message
+    # Compose message (scraped text is escaped so Telegram's HTML mode can't reject it)
+    summary = build_summary(latest)
     message = (
         f"🟢 <b>New Pelosi trade detected</b>\n"
-        f"{latest.get('summary_text','(no summary)')}\n\n"
-        f"Source: {POLITICIAN_PAGE}"
+        f"{escape(summary or '(no summary)')}\n\n"
+        f"Source: {escape(POLITICIAN_PAGE)}"
     )
 
     ok = send_telegram(message)
@@ -271,11 +379,31 @@ def main() -> int:
 
     # Update last_seen.json
     now_ts = int(time.time())
-    save_last_seen({"last_trade_id": latest["id"], "timestamp": now_ts, "summary": latest.get("summary_text")})
+    state = {"last_trade_id": latest["id"], "timestamp": now_ts, "summary": summary}
+    if keep_validators:
+        state.update(validators)
+    save_last_seen(state)
     logging.info("Updated %s with new id.", LAST_SEEN_FILE)
     return 0
 
 
+def run_forever(interval: int) -> None:
+    """
+    Long-running mode: call main() every `interval` seconds in the same process,
+    so module imports and SESSION's pooled connections are paid for only once.
+    """
+    logging.info("Running continuously, checking every %d seconds.", interval)
+    while True:
+        started = time.monotonic()
+        try:
+            main()
+        except Exception as e:
+            logging.exception("Check failed: %s", e)
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
 if __name__ == "__main__":
+    if CHECK_INTERVAL > 0:
+        run_forever(CHECK_INTERVAL)
     exit_code = main()
     sys.exit(exit_code)